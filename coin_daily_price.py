@@ -3,14 +3,21 @@ Collect daily price data for top coins from CoinGecko market_chart API.
 Save raw data as JSON, then process and store into Crypto_prices SQLite table.
 """
 
-import json
-import time
-from datetime import datetime, timezone
+import asyncio
 from pathlib import Path
 
-import requests
-
-from sql_operation import create_crypto_prices_table, get_connection, insert_crypto_prices
+import aiohttp
+import numpy as np
+import zstandard as zstd
+
+from coingecko_api import MAX_CONCURRENT_CONNECTIONS, TokenBucket, fetch_json
+from json_io import json_dumps, json_loads
+from sql_operation import (
+    create_crypto_prices_table,
+    ensure_indexes,
+    get_connection,
+    insert_crypto_prices,
+)
 
 # Top coins by CoinGecko id (market cap order)
 TOP_COIN_IDS = [
@@ -30,55 +37,63 @@ MARKET_CHART_URL = (
     "https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
     "?vs_currency=usd&days=365"
 )
-DELAY_SECONDS = 15
-RETRY_DELAY = 60
-MAX_RETRIES = 3
-RAW_JSON_FILE = "coin_daily_prices_raw.json"
+RAW_JSON_FILE = "coin_daily_prices_raw.json.zst"
+ZSTD_LEVEL = 3
 PROCESSED_JSON_FILE = "coin_daily_prices.json"
 PROJECT_DIR = Path(__file__).resolve().parent
+MAX_IN_FLIGHT = 3  # coin requests allowed in flight at once
 
 
-def fetch_market_chart(coin_id: str) -> dict | None:
-    """Fetch market_chart for one coin (with retries on 429)."""
+async def fetch_market_chart_async(
+    session: aiohttp.ClientSession,
+    bucket: TokenBucket,
+    semaphore: asyncio.Semaphore,
+    coin_id: str,
+) -> dict | None:
+    """Fetch market_chart for one coin through the shared semaphore and token bucket."""
     url = MARKET_CHART_URL.format(coin_id=coin_id)
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = requests.get(url)
-            if response.status_code == 429:
-                if attempt < MAX_RETRIES - 1:
-                    print(f"  Rate limited. Waiting {RETRY_DELAY}s before retry...")
-                    time.sleep(RETRY_DELAY)
-                else:
-                    response.raise_for_status()
-            else:
-                response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            print(f"  Error fetching {coin_id}: {e}")
-            return None
-    return None
+    try:
+        async with semaphore:
+            return await fetch_json(session, bucket, url)
+    except aiohttp.ClientError as e:
+        print(f"  Error fetching {coin_id}: {e}")
+        return None
+
+
+async def _gather_daily_prices() -> dict:
+    """Fetch all coins concurrently (at most MAX_IN_FLIGHT at once)."""
+    bucket = TokenBucket()
+    semaphore = asyncio.Semaphore(MAX_IN_FLIGHT)
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_CONNECTIONS)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        print(f"  Fetching {len(TOP_COIN_IDS)} coins ({MAX_IN_FLIGHT} in flight)...")
+        results = await asyncio.gather(
+            *(
+                fetch_market_chart_async(session, bucket, semaphore, coin_id)
+                for coin_id in TOP_COIN_IDS
+            )
+        )
+    return {coin_id: data for coin_id, data in zip(TOP_COIN_IDS, results) if data is not None}
 
 
 def fetch_all_daily_prices() -> dict:
     """Fetch market_chart for all top coins and return { coin_id: api_response }."""
-    result = {}
-    for i, coin_id in enumerate(TOP_COIN_IDS, 1):
-        print(f"  Fetching {i}/{len(TOP_COIN_IDS)}: {coin_id}...")
-        data = fetch_market_chart(coin_id)
-        if data is not None:
-            result[coin_id] = data
-        if i < len(TOP_COIN_IDS):
-            time.sleep(DELAY_SECONDS)
-    return result
+    return asyncio.run(_gather_daily_prices())
 
 
 def save_raw_to_json(data: dict, filepath: Path) -> None:
-    """Write raw API responses to a JSON file."""
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    """Write raw API responses as zstd-compressed JSON."""
+    with open(filepath, "wb") as f, zstd.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(f) as writer:
+        writer.write(json_dumps(data))
     print(f"Raw data saved to {filepath} ({len(data)} coins).")
 
 
+def load_raw_json(filepath: Path) -> dict:
+    """Load raw API responses from zstd-compressed JSON."""
+    with open(filepath, "rb") as f, zstd.ZstdDecompressor().stream_reader(f) as reader:
+        return json_loads(reader.read())
+
+
 def process_prices_to_rows(raw_data: dict) -> list[dict]:
     """
     Convert raw market_chart responses to a list of records:
@@ -88,28 +103,34 @@ def process_prices_to_rows(raw_data: dict) -> list[dict]:
     rows = []
     for coin_id, api_data in raw_data.items():
         prices = api_data.get("prices") or []
-        # Group by date (UTC day) and keep last price of the day
-        by_date = {}
-        for ts_ms, price in prices:
-            dt = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc)
-            day = dt.strftime("%Y-%m-%d")
-            by_date[day] = round(float(price), 6)
-        for date, price_usd in sorted(by_date.items()):
-            rows.append({"coin_id": coin_id, "date": date, "price_usd": price_usd})
+        if not prices:
+            continue
+        # Group by UTC day number and keep last price of the day (vectorized)
+        arr = np.asarray(prices, dtype=np.float64)
+        day_num = arr[:, 0].astype(np.int64) // 86_400_000
+        price_usd = np.round(arr[:, 1], 6)
+        # CoinGecko returns points in ascending time order, so day runs are
+        # contiguous: the final entry of each run is the day's last price.
+        last = np.flatnonzero(np.r_[day_num[1:] != day_num[:-1], True])
+        dates = day_num[last].astype("datetime64[D]").astype(str)
+        rows.extend(
+            {"coin_id": coin_id, "date": date, "price_usd": price}
+            for date, price in zip(dates.tolist(), price_usd[last].tolist())
+        )
     return rows
 
 
 def save_processed_to_json(rows: list[dict], filepath: Path) -> None:
     """Write processed price rows to JSON."""
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(rows, f, indent=2, ensure_ascii=False)
+    with open(filepath, "wb") as f:
+        f.write(json_dumps(rows))
     print(f"Processed data saved to {filepath} ({len(rows)} rows).")
 
 
 def load_processed_json(filepath: Path) -> list[dict]:
     """Load processed price rows from JSON."""
-    with open(filepath, encoding="utf-8") as f:
-        return json.load(f)
+    with open(filepath, "rb") as f:
+        return json_loads(f.read())
 
 
 def store_prices_to_sqlite(rows: list[dict]) -> int:
@@ -150,6 +171,7 @@ def main() -> None:
     print("Storing data into Crypto_prices table...")
     create_crypto_prices_table()
     count = store_prices_to_sqlite(rows)
+    ensure_indexes()
     print(f"Done. {count} rows in Crypto_prices.")
 
 
@@ -0,0 +1,102 @@
+"""
+Shared async HTTP helpers for the CoinGecko API.
+Provides an adaptive token bucket rate limiter and a JSON fetch coroutine
+used by coin_daily_price.py and collect_coingecko_data.py.
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+
+import aiohttp
+
+MAX_CONCURRENT_CONNECTIONS = 5
+MAX_RETRIES = 3
+BACKOFF_BASE = 5   # seconds; first fallback retry delay before jitter
+BACKOFF_CAP = 60   # seconds; upper bound for the exponential fallback
+
+# Adaptive rate tuning: grow slowly on success, halve on 429.
+RATE_INCREASE_STEP = 0.05   # tokens/sec added per successful response
+RATE_INCREASE_CAP = 2.0     # max rate as a multiple of the initial rate
+RATE_DECREASE_FACTOR = 0.5  # multiply rate by this on 429
+RATE_FLOOR = 0.05           # never throttle below this many tokens/sec
+
+
+@dataclass
+class TokenBucket:
+    """
+    Adaptive token bucket: each request takes one token, tokens refill at
+    `rate` per second. Successful responses nudge the rate up; a 429 halves
+    it and empties the bucket so concurrent requests back off together.
+    """
+
+    capacity: float = 2.0
+    rate: float = 0.5  # tokens per second (~1 request / 2s to start)
+    tokens: float = field(init=False)
+    last_refill: float = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self._initial_rate = self.rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available, then consume it."""
+        while True:
+            self._refill()
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+    def increase_rate(self) -> None:
+        """Called on 2xx: speed up a little, capped relative to the initial rate."""
+        self.rate = min(self.rate + RATE_INCREASE_STEP, RATE_INCREASE_CAP * self._initial_rate)
+
+    def decrease_rate(self) -> None:
+        """Called on 429: halve the rate and drain the bucket."""
+        self.rate = max(self.rate * RATE_DECREASE_FACTOR, RATE_FLOOR)
+        self.tokens = 0.0
+        self.last_refill = time.monotonic()
+
+
+def retry_delay_seconds(retry_after: str | None, attempt: int) -> float:
+    """
+    Delay before retrying a 429: the server's Retry-After when present,
+    otherwise capped exponential backoff with jitter.
+    """
+    if retry_after:
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            pass  # malformed header; fall through to backoff
+    return min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt) * (0.5 + random.random())
+
+
+async def fetch_json(
+    session: aiohttp.ClientSession,
+    bucket: TokenBucket,
+    url: str,
+    max_retries: int = MAX_RETRIES,
+):
+    """GET a JSON document through the shared token bucket (with retries on 429)."""
+    for attempt in range(max_retries):
+        await bucket.acquire()
+        async with session.get(url) as response:
+            if response.status == 429:
+                bucket.decrease_rate()
+                if attempt < max_retries - 1:
+                    delay = retry_delay_seconds(response.headers.get("Retry-After"), attempt)
+                    print(f"  Rate limited. Waiting {delay:.1f}s before retry...")
+                    await asyncio.sleep(delay)
+                    continue
+            response.raise_for_status()
+            bucket.increase_rate()
+            return await response.json()
+    return None
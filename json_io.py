@@ -0,0 +1,23 @@
+"""
+Shared JSON serialization helpers.
+Uses orjson when available (much faster C parser/serializer) and falls back
+to the stdlib, so coin_daily_price.py, collect_coingecko_data.py and
+pandas_operations.py share one implementation.
+"""
+
+try:
+    import orjson
+
+    def json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    def json_loads(data: bytes):
+        return orjson.loads(data)
+except ImportError:  # fall back to stdlib json
+    import json
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+    def json_loads(data: bytes):
+        return json.loads(data)
@@ -5,22 +5,47 @@ and store in the oil_price SQLite table (date PRIMARY KEY, price_usd).
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from sql_operation import create_oil_price_table, insert_oil_prices
+from sql_operation import (
+    create_oil_price_table,
+    ensure_indexes,
+    insert_oil_prices,
+    push_oil_prices_dataframe,
+)
 
 WTI_CSV_URL = (
     "https://raw.githubusercontent.com/datasets/oil-prices/main/data/wti-daily.csv"
 )
 DATE_START = "2020-01-01"
 DATE_END = "2026-01-31"
+REQUEST_TIMEOUT = 15
+
+# Module-level session: keep-alive connection pooling plus urllib3-driven
+# retries with backoff for transient errors and rate limits.
+_SESSION = requests.Session()
+_SESSION.headers.update({"Accept": "text/csv", "User-Agent": "cross-market-analysis/1.0"})
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=10,
+        max_retries=Retry(total=3, status_forcelist=[429, 502, 503, 504], backoff_factor=1),
+    ),
+)
 
 
 def fetch_wti_csv(verify_ssl: bool = True) -> pd.DataFrame:
-    """Download WTI daily CSV and return as DataFrame with columns Date, Price."""
-    response = requests.get(WTI_CSV_URL, verify=verify_ssl)
-    response.raise_for_status()
-    df = pd.read_csv(pd.io.common.BytesIO(response.content))
-    return df
+    """
+    Download WTI daily CSV and return as DataFrame with columns Date, Price.
+    Streams the response straight into the CSV parser (no full-body buffer)
+    and parses Date during the CSV pass.
+    """
+    with _SESSION.get(WTI_CSV_URL, stream=True, verify=verify_ssl, timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        return pd.read_csv(response.raw, parse_dates=["Date"], dtype={"Price": "float64"})
 
 
 def load_wti_csv_from_file(filepath: str) -> pd.DataFrame:
@@ -35,8 +60,8 @@ def filter_date_range(
     end: str = DATE_END,
 ) -> pd.DataFrame:
     """Filter rows where date is between start and end (inclusive)."""
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
+    if not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+        df = df.assign(**{date_col: pd.to_datetime(df[date_col], format="%Y-%m-%d", cache=True)})
     start_ts = pd.Timestamp(start)
     end_ts = pd.Timestamp(end)
     mask = (df[date_col] >= start_ts) & (df[date_col] <= end_ts)
@@ -48,12 +73,9 @@ def prepare_oil_price_rows(df: pd.DataFrame) -> list[tuple]:
     Map DataFrame with Date, Price to list of (date_str, price_usd).
     date as YYYY-MM-DD, price rounded to 6 decimals.
     """
-    rows = []
-    for _, row in df.iterrows():
-        date_str = pd.Timestamp(row["Date"]).strftime("%Y-%m-%d")
-        price = round(float(row["Price"]), 6)
-        rows.append((date_str, price))
-    return rows
+    dates = df["Date"].dt.strftime("%Y-%m-%d").to_numpy()
+    prices = df["Price"].astype("float64").round(6).to_numpy()
+    return list(zip(dates.tolist(), prices.tolist()))
 
 
 def main(
@@ -78,10 +100,10 @@ def main(
             df = fetch_wti_csv(verify_ssl=False)
     print(f"Filtering for {DATE_START} – {DATE_END}...")
     df_filtered = filter_date_range(df, start=DATE_START, end=DATE_END)
-    rows = prepare_oil_price_rows(df_filtered)
-    print(f"Storing {len(rows)} rows into oil_price table...")
+    print(f"Storing {len(df_filtered)} rows into oil_price table...")
     create_oil_price_table()
-    insert_oil_prices(rows)
+    push_oil_prices_dataframe(df_filtered)
+    ensure_indexes()
     print("Done.")
 
 
@@ -5,6 +5,8 @@ Loads coingecko_markets.json into a DataFrame for analysis.
 
 import pandas as pd
 
+from json_io import json_loads
+
 INPUT_JSON = "coingecko_markets.json"
 
 COLUMNS = [
@@ -14,9 +16,13 @@ COLUMNS = [
 
 
 def load_dataframe(filepath: str = INPUT_JSON) -> pd.DataFrame:
-    """Load CoinGecko market data from JSON into a pandas DataFrame."""
-    df = pd.read_json(filepath)
-    return df
+    """
+    Load CoinGecko market data from JSON into a pandas DataFrame.
+    Parses with orjson and keeps only the columns the pipeline uses.
+    """
+    with open(filepath, "rb") as f:
+        data = json_loads(f.read())
+    return pd.DataFrame.from_records(data, columns=COLUMNS)
 
 
 def filter_columns(df: pd.DataFrame) -> pd.DataFrame:
@@ -5,6 +5,7 @@ Loads the filtered DataFrame from pandas_operations and pushes it to Cryptocurre
 """
 
 import sqlite3
+from datetime import date
 
 import pandas as pd
 
@@ -12,10 +13,76 @@ from pandas_operations import filter_columns, load_dataframe
 
 DB_PATH = "cryptocurrencies.db"
 
+# Bind date values natively as ISO-8601 text so loaders can pass
+# datetime.date / pd.Timestamp objects without per-row strftime calls.
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(pd.Timestamp, lambda ts: ts.date().isoformat())
+
+# Chunk bulk inserts so very large batches stay within the page cache.
+INSERT_CHUNK_SIZE = 10_000
+
+# Tables already ensured this process, so insert helpers skip the redundant
+# CREATE TABLE IF NOT EXISTS parse + commit on every batch.
+_TABLES_CREATED: set[str] = set()
+
+
+_CONN: sqlite3.Connection | None = None
+
 
 def get_connection() -> sqlite3.Connection:
-    """Return a connection to the SQLite database."""
-    return sqlite3.connect(DB_PATH)
+    """
+    Return the shared connection to the SQLite database (created lazily).
+    Opens in autocommit (isolation_level=None) so bulk writers control their
+    own transactions; WAL + NORMAL sync + larger caches speed batched loads
+    and let readers run while a writer commits. Callers must not close the
+    returned connection; use close_connection() for teardown.
+    """
+    global _CONN
+    if _CONN is None:
+        conn = sqlite3.connect(
+            DB_PATH, isolation_level=None, cached_statements=256, check_same_thread=False
+        )
+        conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-65536;
+            PRAGMA mmap_size=1073741824;
+            PRAGMA busy_timeout=5000;
+            """
+        )
+        _CONN = conn
+    return _CONN
+
+
+def close_connection() -> None:
+    """Close the shared connection; the next get_connection() reopens it."""
+    global _CONN
+    if _CONN is not None:
+        _CONN.close()
+        _CONN = None
+
+
+def _bulk_executemany(conn: sqlite3.Connection, sql: str, rows: list[tuple]) -> None:
+    """
+    Run executemany for all rows inside one explicit transaction (one fsync).
+    Reuses a single explicit cursor across chunks instead of letting the
+    Connection shortcut create one per call; rows should carry builtin
+    int/float/str scalars so binding skips the adapter path. Rolls back on
+    failure so the shared connection never stays inside an open transaction.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            cur.executemany(sql, rows[start : start + INSERT_CHUNK_SIZE])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
 
 
 def create_cryptocurrencies_table(conn: sqlite3.Connection | None = None) -> None:
@@ -40,16 +107,14 @@ def create_cryptocurrencies_table(conn: sqlite3.Connection | None = None) -> Non
         last_updated    TEXT
     );
     """
-    own_conn = conn is None
-    if own_conn:
+    if "Cryptocurrencies" in _TABLES_CREATED:
+        return
+    if conn is None:
         conn = get_connection()
-    try:
-        conn.execute(create_sql)
-        conn.commit()
-        print("Table 'Cryptocurrencies' created successfully.")
-    finally:
-        if own_conn:
-            conn.close()
+    conn.execute(create_sql)
+    conn.commit()
+    _TABLES_CREATED.add("Cryptocurrencies")
+    print("Table 'Cryptocurrencies' created successfully.")
 
 
 def get_filtered_dataframe(filepath: str = "coingecko_markets.json") -> pd.DataFrame:
@@ -63,23 +128,29 @@ def push_dataframe_to_table(df: pd.DataFrame, conn: sqlite3.Connection | None =
     Push the DataFrame (filtered Cryptocurrencies columns) into the Cryptocurrencies table.
     Replaces existing rows so each run is a full refresh. Returns number of rows inserted.
     """
-    own_conn = conn is None
-    if own_conn:
+    if conn is None:
         conn = get_connection()
+    create_cryptocurrencies_table(conn)
+    if "last_updated" in df.columns:
+        # assign builds only the one new column instead of copying the frame;
+        # strftime converts the whole column at once to uniform ISO strings
+        df = df.assign(
+            last_updated=pd.to_datetime(df["last_updated"]).dt.strftime("%Y-%m-%d %H:%M:%S")
+        )
+    insert_sql = "INSERT INTO Cryptocurrencies ({}) VALUES ({})".format(
+        ", ".join(df.columns), ", ".join("?" * len(df.columns))
+    )
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        create_cryptocurrencies_table(conn)
         conn.execute("DELETE FROM Cryptocurrencies")
-        df = df.copy()
-        if "last_updated" in df.columns:
-            df["last_updated"] = df["last_updated"].astype(str)
-        df.to_sql("Cryptocurrencies", conn, if_exists="append", index=False)
+        conn.executemany(insert_sql, df.itertuples(index=False, name=None))
         conn.commit()
-        count = len(df)
-        print(f"Pushed {count} rows to Cryptocurrencies.")
-        return count
-    finally:
-        if own_conn:
-            conn.close()
+    except Exception:
+        conn.rollback()
+        raise
+    count = len(df)
+    print(f"Pushed {count} rows to Cryptocurrencies.")
+    return count
 
 
 def load_and_push_to_cryptocurrencies(filepath: str = "coingecko_markets.json") -> int:
@@ -104,16 +175,14 @@ def create_crypto_prices_table(conn: sqlite3.Connection | None = None) -> None:
         FOREIGN KEY (coin_id) REFERENCES Cryptocurrencies(id)
     );
     """
-    own_conn = conn is None
-    if own_conn:
+    if "Crypto_prices" in _TABLES_CREATED:
+        return
+    if conn is None:
         conn = get_connection()
-    try:
-        conn.execute(create_sql)
-        conn.commit()
-        print("Table 'Crypto_prices' created successfully.")
-    finally:
-        if own_conn:
-            conn.close()
+    conn.execute(create_sql)
+    conn.commit()
+    _TABLES_CREATED.add("Crypto_prices")
+    print("Table 'Crypto_prices' created successfully.")
 
 
 def insert_crypto_prices(rows: list[tuple], conn: sqlite3.Connection | None = None) -> int:
@@ -121,37 +190,50 @@ def insert_crypto_prices(rows: list[tuple], conn: sqlite3.Connection | None = No
     Insert (coin_id, date, price_usd) rows into Crypto_prices.
     Uses REPLACE so re-running upserts by (coin_id, date). Returns number of rows.
     """
-    own_conn = conn is None
-    if own_conn:
+    if conn is None:
         conn = get_connection()
+    create_crypto_prices_table(conn)
+    _bulk_executemany(
+        conn,
+        "REPLACE INTO Crypto_prices (coin_id, date, price_usd) VALUES (?, ?, ?)",
+        rows,
+    )
+    count = len(rows)
+    print(f"Inserted {count} rows into Crypto_prices.")
+    return count
+
+
+def _read_query(
+    query: str, params: list | tuple | None = None
+) -> pd.DataFrame:
+    """
+    Run a SELECT through a raw cursor and build the DataFrame from the fetched
+    records; skips pd.read_sql's per-call introspection on these hot paths.
+    """
+    cur = get_connection().execute(query, params or ())
     try:
-        create_crypto_prices_table(conn)
-        conn.executemany(
-            "REPLACE INTO Crypto_prices (coin_id, date, price_usd) VALUES (?, ?, ?)",
-            rows,
-        )
-        conn.commit()
-        count = len(rows)
-        print(f"Inserted {count} rows into Crypto_prices.")
-        return count
+        columns = [d[0] for d in cur.description]
+        return pd.DataFrame.from_records(cur.fetchall(), columns=columns)
     finally:
-        if own_conn:
-            conn.close()
+        cur.close()
 
 
-def select_cryptocurrencies(limit: int | None = None) -> pd.DataFrame:
+def select_cryptocurrencies(limit: int | None = None, chunksize: int | None = None):
     """
     Run SELECT * FROM Cryptocurrencies and return the result as a DataFrame.
-    Optionally pass limit=N to return only the first N rows.
+    Optionally pass limit=N to return only the first N rows, or chunksize=N
+    to get an iterator of N-row DataFrames instead of one full frame.
     """
     query = "SELECT * FROM Cryptocurrencies"
+    params = []
     if limit is not None:
-        query += f" LIMIT {int(limit)}"
-    conn = get_connection()
-    try:
-        return pd.read_sql(query, conn)
-    finally:
-        conn.close()
+        query += " LIMIT ?"
+        params.append(int(limit))
+    if chunksize is not None:
+        return pd.read_sql(
+            query, get_connection(), params=params if params else None, chunksize=chunksize
+        )
+    return _read_query(query, params)
 
 
 def create_oil_price_table(conn: sqlite3.Connection | None = None) -> None:
@@ -165,16 +247,14 @@ def create_oil_price_table(conn: sqlite3.Connection | None = None) -> None:
         price_usd DECIMAL(18, 6) NOT NULL
     );
     """
-    own_conn = conn is None
-    if own_conn:
+    if "oil_price" in _TABLES_CREATED:
+        return
+    if conn is None:
         conn = get_connection()
-    try:
-        conn.execute(create_sql)
-        conn.commit()
-        print("Table 'oil_price' created successfully.")
-    finally:
-        if own_conn:
-            conn.close()
+    conn.execute(create_sql)
+    conn.commit()
+    _TABLES_CREATED.add("oil_price")
+    print("Table 'oil_price' created successfully.")
 
 
 def insert_oil_prices(rows: list[tuple], conn: sqlite3.Connection | None = None) -> int:
@@ -182,37 +262,74 @@ def insert_oil_prices(rows: list[tuple], conn: sqlite3.Connection | None = None)
     Insert (date, price_usd) rows into oil_price.
     Uses REPLACE so re-running upserts by date. Returns number of rows.
     """
-    own_conn = conn is None
-    if own_conn:
+    if conn is None:
+        conn = get_connection()
+    create_oil_price_table(conn)
+    _bulk_executemany(
+        conn,
+        "REPLACE INTO oil_price (date, price_usd) VALUES (?, ?)",
+        rows,
+    )
+    count = len(rows)
+    print(f"Inserted {count} rows into oil_price.")
+    return count
+
+
+def push_oil_prices_dataframe(df: pd.DataFrame, conn: sqlite3.Connection | None = None) -> int:
+    """
+    Push a DataFrame with Date/Price columns into oil_price using multi-row
+    INSERT statements (to_sql method="multi") inside one transaction.
+    Rows already present for the covered date range are replaced.
+    """
+    out = pd.DataFrame(
+        {
+            "date": df["Date"].dt.strftime("%Y-%m-%d"),
+            "price_usd": df["Price"].astype("float64").round(6),
+        }
+    )
+    if conn is None:
         conn = get_connection()
+    create_oil_price_table(conn)
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        create_oil_price_table(conn)
-        conn.executemany(
-            "REPLACE INTO oil_price (date, price_usd) VALUES (?, ?)",
-            rows,
+        conn.execute(
+            "DELETE FROM oil_price WHERE date BETWEEN ? AND ?",
+            (out["date"].min(), out["date"].max()),
+        )
+        # Keep each multi-row INSERT under SQLite's 999 bound-parameter limit
+        out.to_sql(
+            "oil_price",
+            conn,
+            if_exists="append",
+            index=False,
+            method="multi",
+            chunksize=999 // len(out.columns),
         )
         conn.commit()
-        count = len(rows)
-        print(f"Inserted {count} rows into oil_price.")
-        return count
-    finally:
-        if own_conn:
-            conn.close()
+    except Exception:
+        conn.rollback()
+        raise
+    count = len(out)
+    print(f"Inserted {count} rows into oil_price.")
+    return count
 
 
-def select_oil_price(limit: int | None = None) -> pd.DataFrame:
+def select_oil_price(limit: int | None = None, chunksize: int | None = None):
     """
     Run SELECT * FROM oil_price and return the result as a DataFrame.
-    Optionally pass limit=N to return only the first N rows.
+    Optionally pass limit=N to return only the first N rows, or chunksize=N
+    to get an iterator of N-row DataFrames instead of one full frame.
     """
     query = "SELECT * FROM oil_price ORDER BY date"
+    params = []
     if limit is not None:
-        query += f" LIMIT {int(limit)}"
-    conn = get_connection()
-    try:
-        return pd.read_sql(query, conn)
-    finally:
-        conn.close()
+        query += " LIMIT ?"
+        params.append(int(limit))
+    if chunksize is not None:
+        return pd.read_sql(
+            query, get_connection(), params=params if params else None, chunksize=chunksize
+        )
+    return _read_query(query, params)
 
 
 def create_stock_price_table(conn: sqlite3.Connection | None = None) -> None:
@@ -233,16 +350,14 @@ def create_stock_price_table(conn: sqlite3.Connection | None = None) -> None:
         PRIMARY KEY (ticker, date)
     );
     """
-    own_conn = conn is None
-    if own_conn:
+    if "stock_price" in _TABLES_CREATED:
+        return
+    if conn is None:
         conn = get_connection()
-    try:
-        conn.execute(create_sql)
-        conn.commit()
-        print("Table 'stock_price' created successfully.")
-    finally:
-        if own_conn:
-            conn.close()
+    conn.execute(create_sql)
+    conn.commit()
+    _TABLES_CREATED.add("stock_price")
+    print("Table 'stock_price' created successfully.")
 
 
 def insert_stock_prices(rows: list[tuple], conn: sqlite3.Connection | None = None) -> int:
@@ -250,31 +365,50 @@ def insert_stock_prices(rows: list[tuple], conn: sqlite3.Connection | None = Non
     Insert (date, open, high, low, close, volume, ticker) rows into stock_price.
     Uses REPLACE so re-running upserts by (ticker, date). Returns number of rows.
     """
-    own_conn = conn is None
-    if own_conn:
+    if conn is None:
         conn = get_connection()
-    try:
-        create_stock_price_table(conn)
-        conn.executemany(
-            "REPLACE INTO stock_price (date, open, high, low, close, volume, ticker) VALUES (?, ?, ?, ?, ?, ?, ?)",
-            rows,
-        )
-        conn.commit()
-        count = len(rows)
-        print(f"Inserted {count} rows into stock_price.")
-        return count
-    finally:
-        if own_conn:
-            conn.close()
+    create_stock_price_table(conn)
+    _bulk_executemany(
+        conn,
+        "REPLACE INTO stock_price (date, open, high, low, close, volume, ticker) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    count = len(rows)
+    print(f"Inserted {count} rows into stock_price.")
+    return count
+
+
+def ensure_indexes(conn: sqlite3.Connection | None = None) -> None:
+    """
+    Create the secondary indexes used by the report queries, then ANALYZE.
+    The (coin_id, date) and (ticker, date) filters are already covered by the
+    table primary keys; these date-leading indexes serve the date-driven joins.
+    oil_price needs none (date is its primary key). ANALYZE refreshes the
+    planner statistics so the indexes are actually chosen after bulk loads.
+    """
+    if conn is None:
+        conn = get_connection()
+    create_crypto_prices_table(conn)
+    create_stock_price_table(conn)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS ix_crypto_prices_date ON Crypto_prices(date, coin_id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS ix_stock_price_date ON stock_price(date, ticker)"
+    )
+    conn.execute("ANALYZE")
+    conn.commit()
 
 
 def select_stock_price(
     ticker: str | None = None,
     limit: int | None = None,
-) -> pd.DataFrame:
+    chunksize: int | None = None,
+):
     """
     Run SELECT * FROM stock_price and return the result as a DataFrame.
     Optionally filter by ticker and/or limit rows. Results ordered by ticker, date.
+    Pass chunksize=N to get an iterator of N-row DataFrames instead of one frame.
     """
     query = "SELECT * FROM stock_price"
     params = []
@@ -283,24 +417,24 @@ def select_stock_price(
         params.append(ticker)
     query += " ORDER BY ticker, date"
     if limit is not None:
-        query += f" LIMIT {int(limit)}"
-    conn = get_connection()
-    try:
-        return pd.read_sql(query, conn, params=params if params else None)
-    finally:
-        conn.close()
+        query += " LIMIT ?"
+        params.append(int(limit))
+    if chunksize is not None:
+        return pd.read_sql(
+            query, get_connection(), params=params if params else None, chunksize=chunksize
+        )
+    return _read_query(query, params)
 
 
-def run_query(query: str, params: list | tuple | None = None) -> pd.DataFrame:
+def run_query(query: str, params: list | tuple | None = None, chunksize: int | None = None):
     """
     Execute a SELECT query and return the result as a DataFrame.
     Use ? placeholders and pass params for parameterized queries.
+    Pass chunksize=N to get an iterator of N-row DataFrames instead of one frame.
     """
-    conn = get_connection()
-    try:
-        return pd.read_sql(query, conn, params=params)
-    finally:
-        conn.close()
+    if chunksize is not None:
+        return pd.read_sql(query, get_connection(), params=params, chunksize=chunksize)
+    return _read_query(query, params)
 
 
 def main() -> None:
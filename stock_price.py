@@ -3,12 +3,14 @@ Download historical daily stock/index data for selected tickers via Yahoo Financ
 filter Jan 2020 – Sept 2025, and store in the stock_price SQLite table.
 """
 
+import random
 import time
+from pathlib import Path
+
 import pandas as pd
 import yfinance as yf
-from yfinance.exceptions import YFRateLimitError
 
-from sql_operation import create_stock_price_table, insert_stock_prices
+from sql_operation import create_stock_price_table, ensure_indexes, insert_stock_prices
 
 USE_INSECURE_SESSION = True
 
@@ -16,9 +18,17 @@ TICKERS = ["^GSPC", "^IXIC", "^NSEI"]
 DATE_START = "2020-01-01"
 DATE_END = "2025-10-01"   # slightly extended (Yahoo end date is exclusive)
 
-DELAY_BETWEEN_TICKERS = 3
 RATE_LIMIT_RETRIES = 4
 RATE_LIMIT_WAIT_SEC = 45
+RATE_LIMIT_WAIT_CAP = 300
+
+# Downloaded history is memoized to parquet per (ticker, start, end) so
+# re-runs skip the Yahoo round trip entirely. Delete cache/ to force a refresh.
+CACHE_DIR = Path(__file__).resolve().parent / "cache"
+
+
+def _cache_path(ticker: str, start: str, end: str) -> Path:
+    return CACHE_DIR / f"{ticker.replace('^', '')}_{start}_{end}.parquet"
 
 
 def _get_session():
@@ -35,6 +45,19 @@ def _get_session():
         return None
 
 
+def _normalize_ticker_frame(df: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """Rename yfinance OHLCV columns, strip the timezone, and tag the ticker."""
+    # Select before rename so only the five kept columns are rebuilt
+    df = df[["Open", "High", "Low", "Close", "Volume"]].rename(columns=str.lower)
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+
+    # Remove ^ from ticker
+    df["ticker"] = ticker.replace("^", "")
+
+    return df
+
+
 def download_ticker_history(ticker: str, start: str, end: str, session=None) -> pd.DataFrame:
     """Download daily OHLCV for one ticker."""
     obj = yf.Ticker(ticker, session=session)
@@ -49,48 +72,91 @@ def download_ticker_history(ticker: str, start: str, end: str, session=None) ->
     print(f"{ticker} → Retrieved {len(df)} rows")
 
     if df.empty:
-        return df
-
-    df = df.rename(columns={
-        "Open": "open",
-        "High": "high",
-        "Low": "low",
-        "Close": "close",
-        "Volume": "volume",
-    })
-
-    df = df[["open", "high", "low", "close", "volume"]]
-    df.index = pd.to_datetime(df.index).tz_localize(None)
-
-    # Remove ^ from ticker
-    df["ticker"] = ticker.replace("^", "")
-
-    return df
+        # Keep the normalized, typed schema even when Yahoo returns nothing
+        return pd.DataFrame(
+            {
+                "open": pd.Series(dtype="float64"),
+                "high": pd.Series(dtype="float64"),
+                "low": pd.Series(dtype="float64"),
+                "close": pd.Series(dtype="float64"),
+                "volume": pd.Series(dtype="int64"),
+                "ticker": pd.Series(dtype="str"),
+            },
+            index=pd.DatetimeIndex([]),
+        )
+
+    return _normalize_ticker_frame(df, ticker)
 
 
 def download_all_tickers(tickers: list[str], start: str, end: str) -> pd.DataFrame:
-    session = _get_session()
+    """
+    Download all tickers in one threaded yf.download call and combine them.
+    Tickers already cached for this (start, end) window load from parquet
+    without hitting Yahoo.
+    """
     frames = []
+    to_fetch = []
+    for t in tickers:
+        path = _cache_path(t, start, end)
+        if path.exists():
+            df = pd.read_parquet(path)
+            print(f"{t} → loaded {len(df)} rows from cache")
+            frames.append(df)
+        else:
+            to_fetch.append(t)
 
-    for i, t in enumerate(tickers):
-        if i > 0:
-            time.sleep(DELAY_BETWEEN_TICKERS)
+    if to_fetch:
+        session = _get_session()
+        remaining = to_fetch
 
+        # yf.download swallows rate-limit errors per ticker and returns empty
+        # frames instead of raising, so retry on missing results rather than
+        # on YFRateLimitError.
         for attempt in range(1, RATE_LIMIT_RETRIES + 1):
-            try:
-                print(f"Downloading {t}...")
-                df = download_ticker_history(t, start, end, session=session)
+            print(f"Downloading {len(remaining)} tickers in parallel...")
+            data = yf.download(
+                remaining,
+                start=start,
+                end=end,
+                group_by="ticker",
+                threads=True,
+                auto_adjust=False,   # safer for indices
+                actions=False,
+                session=session,
+                progress=False,
+            )
+
+            still_missing = []
+            for t in remaining:
+                df = pd.DataFrame()
+                if (
+                    data is not None
+                    and not data.empty
+                    and t in data.columns.get_level_values(0)
+                ):
+                    df = data[t].dropna(how="all")
+                if df.empty:
+                    still_missing.append(t)
+                    continue
+                print(f"{t} → Retrieved {len(df)} rows")
+                df = _normalize_ticker_frame(df, t)
+                CACHE_DIR.mkdir(exist_ok=True)
+                df.to_parquet(_cache_path(t, start, end))
+                frames.append(df)
+
+            remaining = still_missing
+            if not remaining:
                 break
-            except YFRateLimitError:
-                if attempt < RATE_LIMIT_RETRIES:
-                    print(f"Rate limited. Waiting {RATE_LIMIT_WAIT_SEC}s...")
-                    time.sleep(RATE_LIMIT_WAIT_SEC)
-                else:
-                    print(f"Skipping {t} after retries.")
-                    df = pd.DataFrame()
-
-        if not df.empty:
-            frames.append(df)
+            if attempt < RATE_LIMIT_RETRIES:
+                # Exponential backoff with jitter so sustained throttling
+                # waits longer while brief throttling retries quickly.
+                wait = min(
+                    RATE_LIMIT_WAIT_SEC * 2 ** (attempt - 1), RATE_LIMIT_WAIT_CAP
+                ) + random.uniform(0, 5)
+                print(f"No data for {remaining} (likely rate limited). Waiting {wait:.0f}s...")
+                time.sleep(wait)
+            else:
+                print(f"Giving up on {remaining} after retries.")
 
     if not frames:
         return pd.DataFrame()
@@ -99,7 +165,9 @@ def download_all_tickers(tickers: list[str], start: str, end: str) -> pd.DataFra
     combined = combined.dropna(subset=["open", "high", "low", "close", "volume"])
     combined["volume"] = combined["volume"].astype(int)
 
-    return combined.sort_index()
+    # No global sort: each ticker's frame is already date-ordered, inserts
+    # REPLACE by primary key, and select_stock_price orders on read.
+    return combined
 
 
 def prepare_stock_price_rows(df: pd.DataFrame) -> list[tuple]:
@@ -107,21 +175,18 @@ def prepare_stock_price_rows(df: pd.DataFrame) -> list[tuple]:
 
     date_col = "Date" if "Date" in df.columns else df.columns[0]
     df = df.rename(columns={date_col: "date"})
-    df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+    # Keep native date objects; sql_operation registers a sqlite3 adapter
+    # that binds them as ISO-8601 text without per-row strftime.
+    df["date"] = pd.to_datetime(df["date"]).dt.date
 
-    rows = []
-    for _, r in df.iterrows():
-        rows.append((
-            r["date"],
-            round(float(r["open"]), 6),
-            round(float(r["high"]), 6),
-            round(float(r["low"]), 6),
-            round(float(r["close"]), 6),
-            int(r["volume"]),
-            r["ticker"],
-        ))
+    ohlc = df[["open", "high", "low", "close"]].astype("float64").round(6)
+    df = df.assign(**ohlc, volume=df["volume"].astype("int64"))
 
-    return rows
+    return (
+        df[["date", "open", "high", "low", "close", "volume", "ticker"]]
+        .to_records(index=False)
+        .tolist()
+    )
 
 
 def main() -> None:
@@ -138,6 +203,7 @@ def main() -> None:
     print(f"Inserting {len(rows)} rows into database...")
     create_stock_price_table()
     insert_stock_prices(rows)
+    ensure_indexes()
 
     print("Done.")
 